@@ -0,0 +1,138 @@
+import re
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from langchain.schema import Document
+
+PROMPT_TEMPLATE = (
+    "Use the following pieces of context to answer the question at the end. "
+    "If you don't know the answer, just say that you don't know, don't try to make up an answer.\n\n"
+    "{context}\n\nQuestion: {question}\nHelpful Answer:"
+)
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+class ContextBuilder:
+    """Packs retrieved chunks into the generator's encoder token budget"""
+
+    def __init__(self, tokenizer, similarity_model, max_input_tokens: int = 512,
+                 min_answer_tokens: int = 32, max_answer_tokens: int = 200):
+        self.tokenizer = tokenizer
+        self.similarity_model = similarity_model
+        self.max_input_tokens = max_input_tokens
+        self.min_answer_tokens = min_answer_tokens
+        self.max_answer_tokens = max_answer_tokens
+        # chunk text -> token count, sentences, sentence token counts and
+        # (lazily computed) normalized sentence embeddings
+        self._chunk_cache: Dict[str, Dict[str, Any]] = {}
+
+    def _count_tokens(self, text: str) -> int:
+        return len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def _prompt_tokens(self, context: str, question: str) -> int:
+        prompt = PROMPT_TEMPLATE.format(context=context, question=question)
+        return len(self.tokenizer(prompt)["input_ids"])
+
+    def reset(self):
+        """Drop cached chunk tokenization, e.g. when the index is replaced"""
+        self._chunk_cache = {}
+
+    def index_chunks(self, docs: List[Document]):
+        """Tokenize chunks and their sentences once at ingest time"""
+        self.reset()
+        for doc in docs:
+            self._index_chunk(doc.page_content)
+        print(f"DEBUG: Context builder indexed {len(self._chunk_cache)} chunks")
+
+    def _index_chunk(self, text: str) -> Dict[str, Any]:
+        text = text.strip()
+        if text in self._chunk_cache:
+            return self._chunk_cache[text]
+        sentences = [s.strip() for s in SENTENCE_SPLIT.split(text) if s.strip()] or [text]
+        self._chunk_cache[text] = {
+            "tokens": self._count_tokens(text),
+            "sentences": sentences,
+            "sentence_tokens": [self._count_tokens(s) for s in sentences],
+            # Only needed when a chunk has to be trimmed, so embedded on first trim
+            "embeddings": None,
+        }
+        return self._chunk_cache[text]
+
+    def _trim_chunk(self, text: str, question_embedding: np.ndarray, budget: int) -> str:
+        """Keep the sentences most similar to the question that fit in budget, in original order"""
+        entry = self._index_chunk(text)
+        sentences, token_counts = entry["sentences"], entry["sentence_tokens"]
+        if entry["embeddings"] is None:
+            entry["embeddings"] = np.asarray(self.similarity_model.encode(sentences, normalize_embeddings=True))
+        similarities = entry["embeddings"] @ question_embedding
+        keep = []
+        used = 0
+        for idx in np.argsort(-similarities):
+            # +1 for the space joining sentences back together
+            cost = token_counts[idx] + (1 if keep else 0)
+            if used + cost <= budget:
+                keep.append(idx)
+                used += cost
+        return " ".join(sentences[idx] for idx in sorted(keep))
+
+    def build(self, question: str, scored_docs: List[Tuple[Document, float]]) -> Tuple[str, int]:
+        """Return the packed prompt and its encoder token count
+
+        Chunks are added highest score first; any chunk that does not fit whole
+        in the remaining budget is trimmed to its most question-relevant
+        sentences. A question too long for the budget on its own is truncated.
+        """
+        question = self._fit_question(question)
+        budget = self.max_input_tokens - self._prompt_tokens("", question)
+        question_embedding = None
+        parts = []
+        used = 0
+        separator_tokens = self._count_tokens("\n\n")
+
+        for doc, _ in sorted(scored_docs, key=lambda pair: pair[1], reverse=True):
+            remaining = budget - used - (separator_tokens if parts else 0)
+            if remaining <= 0:
+                break
+            text = doc.page_content.strip()
+            tokens = self._index_chunk(text)["tokens"]
+            if tokens > remaining:
+                if question_embedding is None:
+                    question_embedding = np.asarray(
+                        self.similarity_model.encode([question], normalize_embeddings=True)[0]
+                    )
+                text = self._trim_chunk(text, question_embedding, remaining)
+                if not text:
+                    continue
+                tokens = self._count_tokens(text)
+            parts.append(text)
+            used += tokens + (separator_tokens if len(parts) > 1 else 0)
+
+        # Sentence counts are approximate at join boundaries, so verify with the real tokenizer
+        prompt_tokens = self._prompt_tokens("\n\n".join(parts), question)
+        while prompt_tokens > self.max_input_tokens and parts:
+            last = parts[-1].rsplit(" ", 1)
+            parts[-1] = last[0] if len(last) > 1 else ""
+            if not parts[-1]:
+                parts.pop()
+            prompt_tokens = self._prompt_tokens("\n\n".join(parts), question)
+
+        prompt = PROMPT_TEMPLATE.format(context="\n\n".join(parts), question=question)
+        return prompt, prompt_tokens
+
+    def _fit_question(self, question: str) -> str:
+        """Truncate the question so the prompt without any context fits the budget"""
+        if self._prompt_tokens("", question) <= self.max_input_tokens:
+            return question
+        max_question_tokens = max(0, self.max_input_tokens - self._prompt_tokens("", ""))
+        ids = self.tokenizer(question, add_special_tokens=False)["input_ids"][:max_question_tokens]
+        question = self.tokenizer.decode(ids, skip_special_tokens=True)
+        # Decoding can re-tokenize slightly differently, so shave words until it fits
+        while question and self._prompt_tokens("", question) > self.max_input_tokens:
+            question = question.rsplit(" ", 1)[0] if " " in question else ""
+        print(f"DEBUG: Question truncated to {len(question)} characters to fit the encoder budget")
+        return question
+
+    def answer_max_length(self, prompt_tokens: int) -> int:
+        """Scale generation length with how much context was packed"""
+        return int(min(self.max_answer_tokens, max(self.min_answer_tokens, prompt_tokens // 4)))
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+class ExtractionCache:
+    """Persistent, size-bounded LRU cache of page-level extracted text.
+
+    Entries are keyed by a hash of the file bytes plus the extractor version
+    and settings, so changing either invalidates old entries automatically.
+    """
+
+    def __init__(self, cache_dir: str = "./extraction_cache", max_bytes: int = 200 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # key -> size of entry on disk, ordered least to most recently used
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._load_index()
+
+    def _load_index(self):
+        """Rebuild the LRU order from entry files already on disk"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            found = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                stat = os.stat(path)
+                found.append((stat.st_mtime, name[:-len(".json")], stat.st_size))
+            for _, key, size in sorted(found):
+                self._entries[key] = size
+                self._total_bytes += size
+            # The limit may have been lowered since these entries were written
+            self._evict_over_limit()
+            print(f"DEBUG: Extraction cache loaded {len(self._entries)} entries ({self._total_bytes} bytes)")
+        except Exception as e:
+            print(f"WARNING: Could not load extraction cache index: {str(e)}")
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    @staticmethod
+    def make_key(file_path: str, extractor_version: str, settings: Dict[str, Any]) -> str:
+        """Hash the file contents together with the extractor version and settings"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(block)
+        digest.update(extractor_version.encode("utf-8"))
+        digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str, source_size: int = 0) -> Optional[List[str]]:
+        """Return cached page texts for key, or None on a miss"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            path = self._entry_path(key)
+            try:
+                with open(path, 'r', encoding='utf-8') as file:
+                    entry = json.load(file)
+                os.utime(path, None)
+            except Exception as e:
+                print(f"WARNING: Dropping unreadable extraction cache entry {key}: {str(e)}")
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.bytes_saved += source_size
+            return entry["pages"]
+
+    def put(self, key: str, pages: List[str], method: str):
+        """Store page texts for key and evict least recently used entries"""
+        data = json.dumps({"pages": pages, "method": method, "created": time.time()})
+        size = len(data.encode("utf-8"))
+        if size > self.max_bytes:
+            print(f"DEBUG: Extraction result of {size} bytes exceeds cache limit, not caching")
+            return
+        with self._lock:
+            path = self._entry_path(key)
+            tmp_path = f"{path}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as file:
+                    file.write(data)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                print(f"WARNING: Could not write extraction cache entry {key}: {str(e)}")
+                try:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                except Exception:
+                    pass
+                return
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)
+            self._entries[key] = size
+            self._total_bytes += size
+            self._evict_over_limit()
+
+    def _evict_over_limit(self):
+        """Drop least recently used entries until the cache fits max_bytes"""
+        while self._total_bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        self._total_bytes -= self._entries.pop(key, 0)
+        try:
+            os.remove(self._entry_path(key))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"WARNING: Could not delete extraction cache entry {key}: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current cache usage"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes_saved": self.bytes_saved,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
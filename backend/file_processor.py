@@ -1,77 +1,46 @@
 import os
 import tempfile
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from docx import Document
 import pdfplumber
 from pdf2image import convert_from_path
 import pytesseract
 from PIL import Image
+from extraction_cache import ExtractionCache
+
+# Bump whenever extraction logic changes so stale cache entries are ignored
+PDF_EXTRACTOR_VERSION = "1"
 
 
 class FileProcessor:
     """Handles processing of uploaded files (PDF, DOCX, TXT)"""
 
-    def __init__(self):
+    def __init__(self, extraction_cache: Optional[ExtractionCache] = None):
         self.supported_types = ['.pdf', '.docx', '.txt']
+        # Settings that affect PDF output; they are part of the cache key
+        self.pdf_settings = {"table_min_chars": 20, "ocr_dpi": 200, "ocr_lang": "eng"}
+        self.extraction_cache = extraction_cache or ExtractionCache()
 
     def is_supported_file(self, filename: str) -> bool:
         """Check if file type is supported"""
         return any(filename.lower().endswith(ext) for ext in self.supported_types)
 
     def extract_text_from_pdf(self, file_path: str) -> str:
-        """Extract text from PDF file using pdfplumber and Tesseract OCR fallback"""
+        """Extract text from PDF file, reusing cached page text for files seen before"""
         print(f"DEBUG: Processing PDF file: {file_path}")
-        
+
         try:
-            text = ""
-            with pdfplumber.open(file_path) as pdf:
-                print(f"DEBUG: PDF has {len(pdf.pages)} pages")
-                
-                for page_num, page in enumerate(pdf.pages):
-                    # Extract regular text
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-                        print(f"DEBUG: Page {page_num + 1} extracted {len(page_text)} characters")
-                    else:
-                        print(f"DEBUG: Page {page_num + 1} - No text extracted")
-                    
-                    # Also try to extract tables if regular text is minimal
-                    if not page_text or len(page_text.strip()) < 20:
-                        tables = page.extract_tables()
-                        if tables:
-                            print(f"DEBUG: Found {len(tables)} tables on page {page_num + 1}")
-                            for table in tables:
-                                for row in table:
-                                    if row:
-                                        text += " | ".join([cell or "" for cell in row]) + "\n"
-            
-            print(f"DEBUG: pdfplumber extracted {len(text.strip())} characters total")
-            
-            # If no text extracted, try OCR
-            if not text.strip():
-                print("DEBUG: No text found with pdfplumber, trying OCR...")
-                try:
-                    # Convert PDF to images
-                    images = convert_from_path(file_path)
-                    ocr_text = ""
-                    
-                    for i, image in enumerate(images):
-                        print(f"DEBUG: Processing page {i+1} with OCR...")
-                        # Extract text using Tesseract OCR
-                        page_text = pytesseract.image_to_string(image)
-                        if page_text.strip():
-                            ocr_text += page_text + "\n"
-                            print(f"DEBUG: OCR extracted {len(page_text)} characters from page {i+1}")
-                    
-                    if ocr_text.strip():
-                        text = ocr_text.strip()
-                        print(f"DEBUG: OCR extracted {len(text)} characters total")
-                    
-                except Exception as ocr_error:
-                    print(f"DEBUG: OCR failed: {str(ocr_error)}")
-                    raise ValueError(f"Error processing PDF with OCR: {str(ocr_error)}")
-            
+            key = ExtractionCache.make_key(file_path, PDF_EXTRACTOR_VERSION, self.pdf_settings)
+            pages = self.extraction_cache.get(key, source_size=os.path.getsize(file_path))
+            if pages is not None:
+                print(f"DEBUG: Extraction cache hit for {file_path} ({len(pages)} pages)")
+            else:
+                pages, method = self._extract_pdf_pages(file_path)
+                if "".join(pages).strip():
+                    self.extraction_cache.put(key, pages, method)
+
+            text = "".join(pages)
+
             # Final check
             if not text.strip():
                 raise ValueError("No text could be extracted from the PDF. The PDF might be image-based, corrupted, or password-protected.")
@@ -83,6 +52,62 @@ class FileProcessor:
             print(f"DEBUG: Error in extract_text_from_pdf: {str(e)}")
             raise ValueError(f"Error processing PDF: {str(e)}")
 
+    def _extract_pdf_pages(self, file_path: str) -> Tuple[List[str], str]:
+        """Extract per-page text using pdfplumber and Tesseract OCR fallback"""
+        pages = []
+        with pdfplumber.open(file_path) as pdf:
+            print(f"DEBUG: PDF has {len(pdf.pages)} pages")
+            
+            for page_num, page in enumerate(pdf.pages):
+                text = ""
+                # Extract regular text
+                page_text = page.extract_text()
+                if page_text:
+                    text += page_text + "\n"
+                    print(f"DEBUG: Page {page_num + 1} extracted {len(page_text)} characters")
+                else:
+                    print(f"DEBUG: Page {page_num + 1} - No text extracted")
+                
+                # Also try to extract tables if regular text is minimal
+                if not page_text or len(page_text.strip()) < self.pdf_settings["table_min_chars"]:
+                    tables = page.extract_tables()
+                    if tables:
+                        print(f"DEBUG: Found {len(tables)} tables on page {page_num + 1}")
+                        for table in tables:
+                            for row in table:
+                                if row:
+                                    text += " | ".join([cell or "" for cell in row]) + "\n"
+                pages.append(text)
+        
+        print(f"DEBUG: pdfplumber extracted {len(''.join(pages).strip())} characters total")
+        
+        # If no text extracted, try OCR
+        if not "".join(pages).strip():
+            print("DEBUG: No text found with pdfplumber, trying OCR...")
+            try:
+                # Convert PDF to images
+                images = convert_from_path(file_path, dpi=self.pdf_settings["ocr_dpi"])
+                ocr_pages = []
+                
+                for i, image in enumerate(images):
+                    print(f"DEBUG: Processing page {i+1} with OCR...")
+                    # Extract text using Tesseract OCR
+                    page_text = pytesseract.image_to_string(image, lang=self.pdf_settings["ocr_lang"])
+                    if page_text.strip():
+                        ocr_pages.append(page_text + "\n")
+                        print(f"DEBUG: OCR extracted {len(page_text)} characters from page {i+1}")
+                    else:
+                        ocr_pages.append("")
+                
+                print(f"DEBUG: OCR extracted {len(''.join(ocr_pages).strip())} characters total")
+                return ocr_pages, "ocr"
+                
+            except Exception as ocr_error:
+                print(f"DEBUG: OCR failed: {str(ocr_error)}")
+                raise ValueError(f"Error processing PDF with OCR: {str(ocr_error)}")
+
+        return pages, "pdfplumber"
+
     def extract_text_from_docx(self, file_path: str) -> str:
         """Extract text from DOCX file"""
         print(f"DEBUG: Processing DOCX file: {file_path}")
@@ -0,0 +1,311 @@
+import argparse
+import json
+import os
+import shutil
+import struct
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain.schema import Document
+
+# File layout: MAGIC | uint32 format version | uint32 header length | JSON header | sections
+# Every section starts on a 64-byte boundary so it can be memory-mapped directly.
+# The header records [offset, nbytes, crc32] for each section.
+SNAPSHOT_MAGIC = b"RAGSNAP\x00"
+SNAPSHOT_VERSION = 2
+SECTION_ALIGNMENT = 64
+SECTION_NAMES = ("embeddings", "scales", "norms", "text_offsets", "texts", "document")
+DEFAULT_SNAPSHOT_PATH = "./index.ragsnap"
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+# Rows scored per block for int8 snapshots, bounding the float32 working set per query
+SEARCH_BLOCK_ROWS = 4096
+_PREAMBLE = struct.Struct("<8sII")
+
+
+def _align(offset: int) -> int:
+    return (offset + SECTION_ALIGNMENT - 1) // SECTION_ALIGNMENT * SECTION_ALIGNMENT
+
+
+def _quantize(embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization"""
+    scales = np.abs(embeddings).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.round(embeddings / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def export_snapshot(path: str, texts: List[str], metadatas: List[Dict[str, Any]],
+                    embeddings: np.ndarray, embedding_model: str, document_text: str = "",
+                    quantize: bool = False, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Write chunks, metadata and embeddings to a single snapshot file"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if embeddings.ndim != 2 or embeddings.shape[0] != len(texts):
+        raise ValueError("Embeddings must be a 2D array with one row per chunk")
+
+    encoded = [text.encode("utf-8") for text in texts]
+    text_offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    text_offsets[1:] = np.cumsum([len(blob) for blob in encoded])
+
+    if quantize:
+        vectors, scales = _quantize(embeddings)
+        norms = np.linalg.norm(vectors.astype(np.float32) * scales[:, None], axis=1)
+    else:
+        vectors, scales = embeddings, np.zeros(0, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1)
+    # Stored so search never has to expand the matrix; zero rows score zero
+    norms = np.where(norms == 0, 1.0, norms).astype(np.float32)
+
+    payloads = [
+        ("embeddings", vectors.tobytes()),
+        ("scales", scales.tobytes()),
+        ("norms", norms.tobytes()),
+        ("text_offsets", text_offsets.tobytes()),
+        ("texts", b"".join(encoded)),
+        ("document", document_text.encode("utf-8")),
+    ]
+
+    header = {
+        "embedding_model": embedding_model,
+        "dim": int(embeddings.shape[1]),
+        "count": len(texts),
+        "dtype": "int8" if quantize else "float32",
+        "metadatas": metadatas,
+        "created": time.time(),
+        "extra": extra or {},
+        "sections": {},
+    }
+
+    # Section offsets depend on header length, which depends on the offsets; iterate until stable
+    header_bytes = b""
+    while True:
+        offset = _align(_PREAMBLE.size + len(header_bytes))
+        sections = {}
+        for name, payload in payloads:
+            sections[name] = [offset, len(payload), zlib.crc32(payload)]
+            offset = _align(offset + len(payload))
+        header["sections"] = sections
+        candidate = json.dumps(header).encode("utf-8")
+        if len(candidate) == len(header_bytes):
+            header_bytes = candidate
+            break
+        header_bytes = candidate
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as file:
+        file.write(_PREAMBLE.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header_bytes)))
+        file.write(header_bytes)
+        for name, payload in payloads:
+            file.seek(sections[name][0])
+            file.write(payload)
+        file.truncate(offset)
+    os.replace(tmp_path, path)
+
+    print(f"DEBUG: Exported snapshot with {len(texts)} chunks ({header['dtype']}) to {path}")
+    return {key: header[key] for key in ("embedding_model", "dim", "count", "dtype")}
+
+
+class SnapshotVectorStore:
+    """Read-only vector store over a memory-mapped snapshot file
+
+    Implements the subset of the Chroma interface DynamicQABot uses, so an
+    imported snapshot can stand in for a freshly built Chroma index.
+    """
+
+    def __init__(self, path: str, embed_query: Callable[[str], List[float]], verify_checksums: bool = True):
+        self.path = path
+        self.embed_query = embed_query
+        file_size = os.path.getsize(path)
+        with open(path, 'rb') as file:
+            preamble = file.read(_PREAMBLE.size)
+            if len(preamble) < _PREAMBLE.size:
+                raise ValueError(f"{path} is not an index snapshot")
+            magic, version, header_len = _PREAMBLE.unpack(preamble)
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError(f"{path} is not an index snapshot")
+            if version != SNAPSHOT_VERSION:
+                raise ValueError(f"Unsupported snapshot version {version} (expected {SNAPSHOT_VERSION})")
+            header_bytes = file.read(header_len)
+            if len(header_bytes) < header_len:
+                raise ValueError(f"Snapshot {path} is truncated inside its header")
+            try:
+                self.header = json.loads(header_bytes.decode("utf-8"))
+            except ValueError as e:
+                raise ValueError(f"Snapshot {path} has a corrupt header: {str(e)}")
+
+        self._validate_layout(file_size, _PREAMBLE.size + header_len)
+        self._mmap = np.memmap(path, dtype=np.uint8, mode='r')
+        if verify_checksums:
+            for name in SECTION_NAMES:
+                offset, nbytes, checksum = self.header["sections"][name]
+                if zlib.crc32(self._mmap[offset:offset + nbytes]) != checksum:
+                    raise ValueError(f"Snapshot {path} failed checksum for section '{name}'")
+
+        count, dim = self.header["count"], self.header["dim"]
+        self._embeddings = self._section("embeddings", np.dtype(self.header["dtype"])).reshape(count, dim)
+        self._scales = self._section("scales", np.float32) if self.header["dtype"] == "int8" else None
+        self._norms = self._section("norms", np.float32)
+        self._text_offsets = self._section("text_offsets", np.uint64)
+        self._texts = self._section("texts", np.uint8)
+
+        offsets = self._text_offsets
+        if int(offsets[0]) != 0 or int(offsets[-1]) != len(self._texts) or np.any(offsets[1:] < offsets[:-1]):
+            raise ValueError(f"Snapshot {path} has inconsistent text offsets")
+
+    def _validate_layout(self, file_size: int, header_end: int):
+        """Check every section lies inside the file and matches count/dim"""
+        try:
+            count, dim, dtype = int(self.header["count"]), int(self.header["dim"]), self.header["dtype"]
+            sections = self.header["sections"]
+            metadatas = self.header["metadatas"]
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Snapshot {self.path} header is missing fields: {str(e)}")
+        if dtype not in ("float32", "int8"):
+            raise ValueError(f"Snapshot {self.path} has unsupported embedding dtype {dtype}")
+        if len(metadatas) != count:
+            raise ValueError(f"Snapshot {self.path} has {len(metadatas)} metadata entries for {count} chunks")
+
+        expected = {
+            "embeddings": count * dim * np.dtype(dtype).itemsize,
+            "scales": count * 4 if dtype == "int8" else 0,
+            "norms": count * 4,
+            "text_offsets": (count + 1) * 8,
+        }
+        for name in SECTION_NAMES:
+            if name not in sections or len(sections[name]) != 3:
+                raise ValueError(f"Snapshot {self.path} is missing section '{name}'")
+            offset, nbytes, _ = sections[name]
+            if offset < header_end or offset % SECTION_ALIGNMENT or nbytes < 0 or offset + nbytes > file_size:
+                raise ValueError(f"Snapshot {self.path} section '{name}' lies outside the file; it may be truncated")
+            if name in expected and nbytes != expected[name]:
+                raise ValueError(
+                    f"Snapshot {self.path} section '{name}' is {nbytes} bytes, expected {expected[name]}"
+                )
+
+    def _section(self, name: str, dtype) -> np.ndarray:
+        offset, nbytes, _ = self.header["sections"][name]
+        return self._mmap[offset:offset + nbytes].view(dtype)
+
+    @property
+    def embedding_model(self) -> str:
+        return self.header["embedding_model"]
+
+    def document_text(self) -> str:
+        return self._section("document", np.uint8).tobytes().decode("utf-8")
+
+    def _text(self, idx: int) -> str:
+        start, end = int(self._text_offsets[idx]), int(self._text_offsets[idx + 1])
+        return self._texts[start:end].tobytes().decode("utf-8")
+
+    def _vectors(self) -> np.ndarray:
+        if self._scales is None:
+            return np.asarray(self._embeddings)
+        return self._embeddings.astype(np.float32) * self._scales[:, None]
+
+    def __len__(self) -> int:
+        return self.header["count"]
+
+    def similarity_search_with_relevance_scores(self, query: str, k: int = 4) -> List[Tuple[Document, float]]:
+        """Return the k chunks with highest cosine similarity to the query"""
+        count = len(self)
+        if count == 0:
+            return []
+        query_vector = np.asarray(self.embed_query(query), dtype=np.float32)
+        query_vector /= np.linalg.norm(query_vector) or 1.0
+
+        if self._scales is None:
+            scores = self._embeddings @ query_vector
+        else:
+            scores = np.empty(count, dtype=np.float32)
+            for start in range(0, count, SEARCH_BLOCK_ROWS):
+                block = self._embeddings[start:start + SEARCH_BLOCK_ROWS].astype(np.float32)
+                scores[start:start + SEARCH_BLOCK_ROWS] = block @ query_vector
+            scores *= self._scales
+        scores = scores / self._norms
+
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        metadatas = self.header["metadatas"]
+        return [
+            (Document(page_content=self._text(int(idx)), metadata=metadatas[int(idx)]), float(scores[idx]))
+            for idx in top
+        ]
+
+    def get(self, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Return all chunks in the same shape as Chroma.get"""
+        return {
+            "documents": [self._text(idx) for idx in range(len(self))],
+            "metadatas": list(self.header["metadatas"]),
+            "embeddings": self._vectors(),
+        }
+
+    def delete_collection(self):
+        """Release the memory map; the snapshot file itself is left in place"""
+        self._mmap = None
+        self._embeddings = self._scales = self._text_offsets = self._texts = self._norms = None
+
+
+def read_chroma_directory(persist_directory: str, collection_name: str = "langchain") -> Tuple[List[str], List[Dict[str, Any]], np.ndarray]:
+    """Read chunks and embeddings from a Chroma persist directory without an embedding model"""
+    import chromadb
+
+    client = chromadb.PersistentClient(path=persist_directory)
+    collection = client.get_collection(collection_name)
+    data = collection.get(include=["documents", "metadatas", "embeddings"])
+    metadatas = [metadata or {} for metadata in data["metadatas"]]
+    return list(data["documents"]), metadatas, np.asarray(data["embeddings"], dtype=np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import a portable index snapshot")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Write a snapshot from an existing index")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--source", default="./chroma_db",
+                               help="Chroma persist directory or snapshot file to export (default: ./chroma_db)")
+    export_parser.add_argument("--collection", default="langchain", help="Chroma collection name")
+    export_parser.add_argument("--embedding-model", default=EMBEDDING_MODEL_NAME,
+                               help="Model the Chroma index was embedded with (Chroma does not record it)")
+    export_parser.add_argument("--quantize", action="store_true", help="Store embeddings as int8")
+
+    import_parser = subparsers.add_parser("import", help="Validate a snapshot and install it for startup")
+    import_parser.add_argument("path")
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        # Reads the index files directly; never builds a bot, loads models or touches the source
+        if os.path.isdir(args.source):
+            texts, metadatas, embeddings = read_chroma_directory(args.source, args.collection)
+            document_text = "\n".join(texts)
+        else:
+            store = SnapshotVectorStore(args.source, embed_query=None)
+            data = store.get()
+            texts, metadatas, embeddings = data["documents"], data["metadatas"], data["embeddings"]
+            document_text = store.document_text()
+            args.embedding_model = store.embedding_model
+        info = export_snapshot(args.path, texts, metadatas, embeddings, args.embedding_model,
+                               document_text=document_text, quantize=args.quantize)
+        print(f"Exported {info['count']} chunks from {args.source} to {args.path}")
+    else:
+        store = SnapshotVectorStore(args.path, embed_query=None)
+        count = len(store)
+        store.delete_collection()
+        if os.path.abspath(args.path) != os.path.abspath(DEFAULT_SNAPSHOT_PATH):
+            # A running server may have the installed snapshot memory-mapped; replacing
+            # the directory entry keeps its old inode valid instead of rewriting it in place
+            tmp_path = f"{DEFAULT_SNAPSHOT_PATH}.tmp"
+            try:
+                shutil.copyfile(args.path, tmp_path)
+                os.replace(tmp_path, DEFAULT_SNAPSHOT_PATH)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        print(f"Installed snapshot with {count} chunks at {DEFAULT_SNAPSHOT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,15 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from typing import Optional
 from qa_chain import qa_bot, qa_bot_instance
 from file_processor import FileProcessor
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
+import os
+import tempfile
+import uuid
 
 app = FastAPI()
 file_processor = FileProcessor()
@@ -22,6 +28,7 @@ app.add_middleware(
 # Define request models
 class QuestionRequest(BaseModel):
     question: str
+    mode: Optional[str] = None
 
 @app.post("/upload")
 async def upload_document(file: UploadFile = File(...)):
@@ -85,8 +92,10 @@ async def ask_question(request: QuestionRequest):
     Ask a question about the uploaded document
     """
     try:
-        answer = qa_bot(request.question)
+        answer = qa_bot(request.question, request.mode)
         return {"answer": answer}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -101,6 +110,75 @@ async def get_status():
         "supported_formats": file_processor.supported_types
     }
 
+@app.get("/snapshot/export")
+async def export_snapshot(quantize: bool = False):
+    """
+    Download the current index as a portable snapshot file
+    """
+    snapshot_path = os.path.join(tempfile.gettempdir(), f"index_{uuid.uuid4().hex[:8]}.ragsnap")
+    try:
+        qa_bot_instance.export_snapshot(snapshot_path, quantize=quantize)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return FileResponse(
+        snapshot_path,
+        media_type="application/octet-stream",
+        filename="index.ragsnap",
+        background=BackgroundTask(file_processor.cleanup_temp_file, snapshot_path)
+    )
+
+@app.post("/snapshot/import")
+async def import_snapshot(file: UploadFile = File(...)):
+    """
+    Upload a snapshot file and serve queries from it without re-embedding
+    """
+    # Keep the file on disk: the index is memory-mapped from it while in use.
+    # The bot deletes it once a later import or upload replaces the index.
+    os.makedirs("./snapshots", exist_ok=True)
+    snapshot_path = os.path.join("./snapshots", f"{uuid.uuid4().hex[:8]}.ragsnap")
+    
+    # Stream to disk rather than holding the whole snapshot in memory
+    total_bytes = 0
+    with open(snapshot_path, 'wb') as snapshot_file:
+        while True:
+            chunk = await file.read(1024 * 1024)
+            if not chunk:
+                break
+            snapshot_file.write(chunk)
+            total_bytes += len(chunk)
+    
+    if total_bytes == 0:
+        file_processor.cleanup_temp_file(snapshot_path)
+        raise HTTPException(status_code=400, detail="Uploaded file is empty")
+    
+    try:
+        info = qa_bot_instance.import_snapshot(snapshot_path, owned=True)
+    except ValueError as e:
+        file_processor.cleanup_temp_file(snapshot_path)
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        file_processor.cleanup_temp_file(snapshot_path)
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return {"success": True, "path": snapshot_path, **info}
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Get hit/miss counters for the document extraction cache
+    """
+    return {"extraction": file_processor.extraction_cache.stats()}
+
+@app.get("/qa/stats")
+async def get_qa_stats():
+    """
+    Get hit rate and latency for each answering tier
+    """
+    return qa_bot_instance.get_tier_stats()
+
 @app.get("/")
 async def root():
     return {"message": "RAG QA Bot API is running"}
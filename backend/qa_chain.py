@@ -1,37 +1,58 @@
-from langchain.chains import RetrievalQA
 from langchain_community.vectorstores import Chroma
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.llms import HuggingFacePipeline
 from langchain.text_splitter import CharacterTextSplitter
 from langchain_community.document_loaders import TextLoader
 from langchain.schema import Document
 from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, pipeline
 import os
 import shutil
+import time
 from typing import List, Optional
 import numpy as np
 from sentence_transformers import SentenceTransformer  
 from sklearn.metrics.pairwise import cosine_similarity
+from context_builder import ContextBuilder
+from index_snapshot import DEFAULT_SNAPSHOT_PATH, EMBEDDING_MODEL_NAME, SnapshotVectorStore, export_snapshot
 
 class DynamicQABot:
     def __init__(self):
         # Initialize models lazily to speed up startup
         self.embedding_model = None
         self.similarity_model = None
-        self.llm = None
+        self.generator = None
+        self.context_builder = None
+        self.extractive_pipeline = None
         self.models_loaded = False
         
+        # "cascade" tries the extractive model first and only generates when it is unsure
+        self.answer_mode = "cascade"
+        self.extractive_threshold = 0.5
+        self.tier_stats = {
+            "extractive": {"attempts": 0, "answered": 0, "total_latency": 0.0},
+            "generative": {"attempts": 0, "answered": 0, "total_latency": 0.0},
+        }
+        
         # Text splitter
         self.text_splitter = CharacterTextSplitter(chunk_size=500, chunk_overlap=50)
         
         # Initialize with default document if exists
         self.vectorstore = None
-        self.retriever = None
-        self.qa_chain = None
+        # Retrieve one more chunk than fits comfortably; the context builder trims to budget
+        self.retriever_k = 4
         self.current_document_text = None
         
-        # Load default document if exists
-        self._load_default_document()
+        # Snapshot file this bot owns (uploaded via the API); deleted once replaced
+        self.owned_snapshot_path = None
+        
+        # Prefer an installed index snapshot; it is query-ready without re-embedding
+        if os.path.exists(DEFAULT_SNAPSHOT_PATH):
+            try:
+                self.import_snapshot(DEFAULT_SNAPSHOT_PATH)
+            except Exception as e:
+                print(f"Warning: Could not load index snapshot: {str(e)}")
+                self._load_default_document()
+        else:
+            self._load_default_document()
     
     def _load_models(self):
         """Load AI models on first use"""
@@ -41,16 +62,17 @@ class DynamicQABot:
         try:
             print("Loading AI models...")
             # Initialize models
-            self.embedding_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-            self.similarity_model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+            self.embedding_model = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+            self.similarity_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
             
             # Load HuggingFace model for QA
             model_name = "google/flan-t5-small"
             tokenizer = AutoTokenizer.from_pretrained(model_name)
             model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
             
-            pipe = pipeline("text2text-generation", model=model, tokenizer=tokenizer, max_length=200)
-            self.llm = HuggingFacePipeline(pipeline=pipe)
+            self.generator = pipeline("text2text-generation", model=model, tokenizer=tokenizer)
+            # flan-t5 encoder only sees 512 tokens; pack retrieved context to fit exactly
+            self.context_builder = ContextBuilder(tokenizer, self.similarity_model, max_input_tokens=512)
             
             self.models_loaded = True
             print("AI models loaded successfully!")
@@ -58,6 +80,16 @@ class DynamicQABot:
             print(f"Error loading models: {str(e)}")
             raise
     
+    def _load_extractive_model(self):
+        """Load extractive QA model on first cascade use"""
+        if self.extractive_pipeline is None:
+            print("Loading extractive QA model...")
+            model_name = "distilbert-base-cased-distilled-squad"
+            self.extractive_pipeline = pipeline("question-answering",
+                                                model=model_name,
+                                                tokenizer=model_name)
+            print("Extractive QA model loaded successfully!")
+    
     def _load_default_document(self):
         """Load default business_docs.txt if it exists"""
         try:
@@ -80,8 +112,7 @@ class DynamicQABot:
                 except:
                     pass
                 self.vectorstore = None
-                self.retriever = None
-                self.qa_chain = None
+                self._remove_owned_snapshot()
             
             # Wait a bit for file handles to be released
             import time
@@ -119,8 +150,7 @@ class DynamicQABot:
         if not hasattr(self, 'db_dir'):
             self.db_dir = "./chroma_db"
         self.vectorstore = Chroma.from_documents(docs, self.embedding_model, persist_directory=self.db_dir)
-        self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": 3})
-        self.qa_chain = RetrievalQA.from_chain_type(llm=self.llm, retriever=self.retriever)
+        self.context_builder.index_chunks(docs)
     
     def process_document_text(self, text: str, filename: str = "uploaded_document"):
         """Process document text and create vector store"""
@@ -134,6 +164,61 @@ class DynamicQABot:
         
         return f"Document '{filename}' processed successfully. You can now ask questions about it."
     
+    def _remove_owned_snapshot(self):
+        """Delete an API-imported snapshot file once it is no longer mapped"""
+        if self.owned_snapshot_path is None:
+            return
+        try:
+            if os.path.exists(self.owned_snapshot_path):
+                os.remove(self.owned_snapshot_path)
+                print(f"Removed replaced snapshot file: {self.owned_snapshot_path}")
+        except Exception as e:
+            print(f"Warning: Could not delete snapshot file {self.owned_snapshot_path}: {str(e)}")
+        self.owned_snapshot_path = None
+    
+    def _embed_query(self, text: str) -> List[float]:
+        """Embed a query, loading models on first use"""
+        self._load_models()
+        return self.embedding_model.embed_query(text)
+    
+    def export_snapshot(self, path: str, quantize: bool = False) -> dict:
+        """Write the current index to a portable snapshot file"""
+        if self.vectorstore is None:
+            raise ValueError("No document has been indexed yet")
+        
+        data = self.vectorstore.get(include=["documents", "metadatas", "embeddings"])
+        return export_snapshot(
+            path,
+            texts=list(data["documents"]),
+            metadatas=[metadata or {} for metadata in data["metadatas"]],
+            embeddings=np.asarray(data["embeddings"], dtype=np.float32),
+            embedding_model=EMBEDDING_MODEL_NAME,
+            document_text=self.current_document_text or "",
+            quantize=quantize
+        )
+    
+    def import_snapshot(self, path: str, owned: bool = False) -> dict:
+        """Serve queries from a memory-mapped snapshot without re-embedding documents
+
+        With owned=True the file is deleted when a later import or upload replaces it.
+        """
+        store = SnapshotVectorStore(path, embed_query=self._embed_query)
+        if store.embedding_model != EMBEDDING_MODEL_NAME:
+            store.delete_collection()
+            raise ValueError(
+                f"Snapshot was built with {store.embedding_model}, but this server uses {EMBEDDING_MODEL_NAME}"
+            )
+        
+        self._cleanup_vectorstore()
+        self.vectorstore = store
+        self.owned_snapshot_path = path if owned else None
+        self.current_document_text = store.document_text() or None
+        if self.context_builder is not None:
+            self.context_builder.reset()
+        
+        print(f"Loaded index snapshot {path} with {len(store)} chunks")
+        return {"chunks": len(store), "dtype": store.header["dtype"], "embedding_model": store.embedding_model}
+    
     def _check_relevance(self, question: str, threshold: float = 0.3) -> bool:
         """Check if question is relevant to the document content"""
         if not self.current_document_text:
@@ -156,46 +241,125 @@ class DynamicQABot:
             print(f"Error checking relevance: {str(e)}")
             return True  # If error, assume relevant to avoid blocking
     
-    def ask_question(self, question: str) -> dict:
-        """Ask a question about the document"""
-        if not self.qa_chain:
+    def _record_tier(self, tier: str, started: float, answered: bool):
+        stats = self.tier_stats[tier]
+        stats["attempts"] += 1
+        stats["answered"] += int(answered)
+        stats["total_latency"] += time.perf_counter() - started
+    
+    def _answer_extractive(self, question: str, scored_docs) -> Optional[dict]:
+        """Return the best span over the retrieved chunks if it clears the threshold"""
+        self._load_extractive_model()
+        started = time.perf_counter()
+        best = None
+        if scored_docs:
+            # One batched call over all retrieved chunks
+            results = self.extractive_pipeline(
+                question=[question] * len(scored_docs),
+                context=[doc.page_content for doc, _ in scored_docs]
+            )
+            if isinstance(results, dict):
+                results = [results]
+            best = max(results, key=lambda result: result["score"])
+        
+        confident = best is not None and best["score"] >= self.extractive_threshold and best["answer"].strip()
+        self._record_tier("extractive", started, bool(confident))
+        if not confident:
+            return None
+        return {
+            "query": question,
+            "result": best["answer"].strip(),
+            "confidence": best["score"],
+            "tier": "extractive"
+        }
+    
+    def _answer_generative(self, question: str, scored_docs) -> dict:
+        """Generate an answer from the packed retrieved context"""
+        started = time.perf_counter()
+        prompt, prompt_tokens = self.context_builder.build(question, scored_docs)
+        max_length = self.context_builder.answer_max_length(prompt_tokens)
+        
+        outputs = self.generator(prompt, max_length=max_length)
+        answer = outputs[0]["generated_text"].strip() if outputs else ""
+        self._record_tier("generative", started, bool(answer))
+        
+        return {
+            "query": question,
+            "result": answer or "No answer found.",
+            "tier": "generative"
+        }
+    
+    def get_tier_stats(self) -> dict:
+        """Return hit rate and mean latency for each answering tier"""
+        summary = {"mode": self.answer_mode, "extractive_threshold": self.extractive_threshold}
+        for tier, stats in self.tier_stats.items():
+            attempts = stats["attempts"]
+            summary[tier] = {
+                "attempts": attempts,
+                "answered": stats["answered"],
+                "hit_rate": stats["answered"] / attempts if attempts else 0.0,
+                "avg_latency_ms": 1000 * stats["total_latency"] / attempts if attempts else 0.0
+            }
+        return summary
+    
+    def ask_question(self, question: str, mode: Optional[str] = None) -> dict:
+        """Ask a question about the document
+
+        mode is "cascade" (extractive first, generative fallback), "extractive"
+        or "generative"; defaults to self.answer_mode.
+        """
+        mode = mode or self.answer_mode
+        if mode not in ("cascade", "extractive", "generative"):
+            raise ValueError(f"Unsupported answer mode: {mode}")
+        
+        if self.vectorstore is None:
             return {
                 "query": question,
-                "result": "No document has been uploaded yet. Please upload a document first."
+                "result": "No document has been uploaded yet. Please upload a document first.",
+                "tier": None
             }
         
         # Check if question is relevant
         if not self._check_relevance(question):
             return {
                 "query": question,
-                "result": "I'm sorry, but your question doesn't appear to be relevant to the uploaded document. Please ask questions related to the document content."
+                "result": "I'm sorry, but your question doesn't appear to be relevant to the uploaded document. Please ask questions related to the document content.",
+                "tier": None
             }
         
         try:
-            # Get answer from QA chain
-            result = self.qa_chain.invoke({"query": question})
+            scored_docs = self.vectorstore.similarity_search_with_relevance_scores(question, k=self.retriever_k)
             
-            # Format response
-            if isinstance(result, dict):
-                return {
-                    "query": question,
-                    "result": result.get("result", "No answer found.")
-                }
-            else:
+            if mode == "cascade":
+                try:
+                    result = self._answer_extractive(question, scored_docs)
+                except Exception as e:
+                    print(f"Extractive tier failed, escalating to generative: {str(e)}")
+                    result = None
+                if result is not None:
+                    return result
+            elif mode == "extractive":
+                result = self._answer_extractive(question, scored_docs)
+                if result is not None:
+                    return result
                 return {
                     "query": question,
-                    "result": str(result)
+                    "result": "No confident answer found in the document.",
+                    "tier": "extractive"
                 }
+            
+            return self._answer_generative(question, scored_docs)
         except Exception as e:
             return {
                 "query": question,
-                "result": f"Error processing question: {str(e)}"
+                "result": f"Error processing question: {str(e)}",
+                "tier": None
             }
 
 # Create global instance
 qa_bot_instance = DynamicQABot()
 
 # Maintain backward compatibility
-def qa_bot(question):
-    result = qa_bot_instance.ask_question(question)
+def qa_bot(question, mode=None):
+    result = qa_bot_instance.ask_question(question, mode)
     return result